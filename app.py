@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import os
@@ -15,7 +16,31 @@ and their Correlation with Controversy Scores for S&P 500 companies.
 """)
 
 # Load Data
-@st.cache_data
+def read_dataset(path):
+    # Prefer the Parquet copy written by convert_to_parquet.py: columnar,
+    # compressed and already typed, so it loads much faster than the CSV.
+    # It is skipped when the CSV has been edited since it was generated
+    parquet_path = path.replace(".csv", ".parquet")
+    if os.path.exists(parquet_path) and (
+            not os.path.exists(path) or os.path.getmtime(parquet_path) >= os.path.getmtime(path)):
+        try:
+            return pd.read_parquet(parquet_path, engine="pyarrow")
+        except Exception:
+            pass  # pyarrow missing or unreadable file, fall back to the CSV
+    try:
+        from pyarrow import csv as pacsv
+    except ImportError:
+        return pd.read_csv(path)
+    # pyarrow's multithreaded CSV parser; Address and Description span lines
+    # strings_can_be_null keeps empty fields missing, as pd.read_csv does
+    table = pacsv.read_csv(path, read_options=pacsv.ReadOptions(use_threads=True),
+                           parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                           convert_options=pacsv.ConvertOptions(strings_can_be_null=True))
+    return table.to_pandas()
+
+# cache_resource hands back the same frame instead of a copy on every rerun;
+# the app only reads from it
+@st.cache_resource
 def load_data():
     # Prioritize relative path for deployment
     possible_paths = [
@@ -25,9 +50,15 @@ def load_data():
     ]
     
     for path in possible_paths:
-        if os.path.exists(path):
+        if os.path.exists(path) or os.path.exists(path.replace(".csv", ".parquet")):
             try:
-                df = pd.read_csv(path)
+                df = read_dataset(path)
+                # Shrink dtypes: float32 scores and a categorical Sector keep
+                # every reduction (corr, groupby, sort) working on less memory
+                for col in df.select_dtypes('float64').columns:
+                    df[col] = pd.to_numeric(df[col], downcast='float')
+                if 'Sector' in df.columns:
+                    df['Sector'] = df['Sector'].fillna("Unknown").astype(str).astype('category')
                 return df
             except Exception as e:
                 st.error(f"Error reading file at {path}: {e}")
@@ -37,28 +68,142 @@ def load_data():
 
 df_raw = load_data()
 
+# Plotly config for charts that don't need hover/zoom: skips building hover data
+STATIC_CHART_CONFIG = {'staticPlot': True, 'displayModeBar': False}
+
+# Columns shown in the Top Companies table (long text fields are left out)
+DISPLAY_COLS = ('Symbol', 'Name', 'Sector', 'Industry', 'Total ESG Risk score', 'Environment Risk Score',
+                'Social Risk Score', 'Governance Risk Score', 'Controversy Level', 'Controversy Score',
+                'ESG Risk Percentile', 'ESG Risk Level')
+
+# Figures kept per factory; the caches are shared across sessions
+FIGURE_CACHE_ENTRIES = 64
+
+# Upper bound of the Top Companies slider
+TOP_N_MAX = 50
+
+COLUMNS_TO_COMPARE = ['Environment Risk Score', 'Social Risk Score', 'Governance Risk Score', 'Total ESG Risk score', 'Controversy Score']
+
+# Cached computations
+# Keyed on the selected sectors (as a sorted tuple) so reruns triggered by other
+# widgets reuse the previous result instead of recomputing it.
+@st.cache_data
+def sector_mask(sector_key):
+    # Compare the categorical's integer codes rather than the sector strings
+    sector = df_raw['Sector']
+    allowed_codes = sector.cat.categories.get_indexer(list(sector_key))
+    return np.isin(sector.cat.codes.to_numpy(), allowed_codes[allowed_codes >= 0])
+
+def filter_sectors(sector_key):
+    if sector_key is None:
+        return df_raw
+    return df_raw[sector_mask(sector_key)]
+
+@st.cache_data
+def compute_corr(sector_key, cols):
+    # A single np.corrcoef call when the scores are dense; with missing values
+    # (or too few rows) pandas' pairwise-complete corr() keeps the same numbers
+    cols = list(cols)
+    scores = filter_sectors(sector_key)[cols]
+    arr = scores.to_numpy(dtype=np.float64)
+    if len(arr) < 2 or np.isnan(arr).any():
+        return scores.corr()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.corrcoef(arr, rowvar=False)
+    return pd.DataFrame(corr, index=cols, columns=cols)
+
+@st.cache_data
+def column_sets(cols):
+    # Derived column lists only depend on the dataset's columns
+    risk_metrics = [col for col in cols if 'Score' in col or 'score' in col]
+    valid_columns = [col for col in COLUMNS_TO_COMPARE if col in cols]
+    return risk_metrics, valid_columns
+
+@st.cache_data
+def describe_sectors(sector_key, cols):
+    # Summarise only the score columns rather than every numeric column
+    return filter_sectors(sector_key)[list(cols)].describe()
+
+@st.cache_data
+def count_sectors(sector_key):
+    counts = filter_sectors(sector_key)['Sector'].value_counts()
+    # Categorical value_counts also reports sectors that were filtered out
+    return counts[counts > 0].rename_axis('Sector').reset_index(name='Count')
+
+@st.cache_data
+def sector_means(sector_key, cols):
+    # One groupby pass over every metric; the selectbox just picks a column
+    return filter_sectors(sector_key).groupby('Sector', observed=True, sort=False)[list(cols)].mean()
+
+@st.cache_data
+def top_indices(sector_key, cols, n=TOP_N_MAX):
+    # Row labels of the n highest and lowest companies per metric, so the
+    # explorer only has to slice them instead of selecting on every rerun
+    df = filter_sectors(sector_key)
+    return {col: (df.nlargest(n, col).index.to_numpy(), df.nsmallest(n, col).index.to_numpy())
+            for col in cols}
+
+# Cached figure factories: reruns with the same inputs reuse the built figure
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def make_heatmap(sector_key, cols):
+    corr_matrix = compute_corr(sector_key, cols)
+    return px.imshow(corr_matrix, text_auto='.2f', aspect="auto", zmin=-1, zmax=1,
+                     color_continuous_scale='RdBu_r', title="Correlation Heatmap")
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def make_sector_count_chart(sector_key):
+    sector_counts = count_sectors(sector_key)
+    # A single trace coloured by value rather than one trace per sector
+    fig = go.Figure(go.Bar(x=sector_counts['Sector'], y=sector_counts['Count'],
+                           text=sector_counts['Count'],
+                           marker=dict(color=sector_counts['Count'], colorscale='Viridis')))
+    fig.update_layout(title="Companies per Sector", xaxis_title='Sector', yaxis_title='Count')
+    return fig
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def make_sector_metric_chart(sector_key, cols, metric):
+    sector_mean = sector_means(sector_key, cols)[metric].sort_values(ascending=False).reset_index()
+    fig = go.Figure(go.Bar(x=sector_mean['Sector'], y=sector_mean[metric],
+                           texttemplate='%{y:.2f}',
+                           marker=dict(color=sector_mean[metric], colorscale='Viridis')))
+    fig.update_layout(title=f"Average {metric} by Sector", xaxis_title='Sector', yaxis_title=metric)
+    return fig
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def make_scatter(sector_key, x_axis, y_axis, color_by):
+    # Only send the plotted columns to the browser
+    scatter_cols = list(dict.fromkeys([x_axis, y_axis, color_by, 'Symbol']))
+    # WebGL rendering keeps hover responsive with every company plotted
+    return px.scatter(filter_sectors(sector_key)[scatter_cols], x=x_axis, y=y_axis, color=color_by,
+                      hover_name='Symbol', title=f"{x_axis} vs {y_axis}", template="plotly_white",
+                      render_mode='webgl')
+
 if df_raw is not None:
     # --- Sidebar Filters ---
     st.sidebar.header("Filter Options")
     
     # Sector Filter
-    # Ensure Sector column is string type to avoid TypeError during sorting
-    # Fill key columns to avoid issues
+    # Sector is cleaned and made categorical in load_data
     if 'Sector' in df_raw.columns:
-        df_raw['Sector'] = df_raw['Sector'].fillna("Unknown").astype(str)
         all_sectors = sorted(df_raw['Sector'].unique())
-        selected_sectors = st.sidebar.multiselect("Select Sectors", all_sectors, default=all_sectors)
+        # Inside a form, editing the selection only reruns the app on Apply
+        with st.sidebar.form("filters"):
+            selected_sectors = st.multiselect("Select Sectors", all_sectors, default=all_sectors)
+            st.form_submit_button("Apply")
         
         # Filter DataFrame
         if selected_sectors:
-            df = df_raw[df_raw['Sector'].isin(selected_sectors)]
+            sector_key = tuple(sorted(selected_sectors))
         else:
-            df = df_raw.copy()
+            sector_key = None
             st.warning("No sectors selected. Showing all data.")
     else:
-        df = df_raw.copy()
+        sector_key = None
         st.error("Column 'Sector' not found in dataset")
 
+    df = filter_sectors(sector_key)
+    risk_metrics, valid_columns = column_sets(tuple(df_raw.columns))
+
     # --- Section 1: Overview ---
     st.header("1. Dataset Overview")
     
@@ -70,29 +215,19 @@ if df_raw is not None:
         
     with col2:
         st.subheader("Statistical Summary")
-        st.dataframe(df.describe(), use_container_width=True)
+        st.dataframe(describe_sectors(sector_key, tuple(risk_metrics)), use_container_width=True)
 
     if 'Sector' in df.columns:
         st.subheader("Sector Distribution")
-        sector_counts = df['Sector'].value_counts().reset_index()
-        sector_counts.columns = ['Sector', 'Count']
-        
-        fig_sector = px.bar(sector_counts, x='Sector', y='Count', title="Companies per Sector",
-                            color='Sector', text='Count')
-        st.plotly_chart(fig_sector, use_container_width=True)
+        fig_sector = make_sector_count_chart(sector_key)
+        st.plotly_chart(fig_sector, use_container_width=True, config=STATIC_CHART_CONFIG)
 
     # --- Section 2: Correlation Analysis ---
     st.header("2. Interactive Correlation Analysis")
     st.markdown("Correlation between different Risk Scores and Controversy Score.")
     
-    columns_to_compare = ['Environment Risk Score', 'Social Risk Score', 'Governance Risk Score', 'Total ESG Risk score', 'Controversy Score']
-    valid_columns = [col for col in columns_to_compare if col in df.columns]
-    
     if len(valid_columns) > 1:
-        corr_matrix = df[valid_columns].corr()
-        
-        fig_corr = px.imshow(corr_matrix, text_auto=True, aspect="auto",
-                             color_continuous_scale='RdBu_r', title="Correlation Heatmap")
+        fig_corr = make_heatmap(sector_key, tuple(valid_columns))
         st.plotly_chart(fig_corr, use_container_width=True)
         
         st.info("Insight: Social Risk Score often has the highest correlation with the Total ESG Risk Score.")
@@ -102,17 +237,12 @@ if df_raw is not None:
     # --- Section 3: Sector Breakdown ---
     st.header("3. Sector Breakdown Analysis")
     
-    risk_metrics = [col for col in df.columns if 'Score' in col or 'score' in col]
     selected_metric = st.selectbox("Select Risk Metric to Visualize by Sector", risk_metrics, index=0)
     
     if selected_metric and 'Sector' in df.columns:
         # Calculate mean by sector
-        sector_mean = df.groupby('Sector')[selected_metric].mean().reset_index().sort_values(by=selected_metric, ascending=False)
-        
-        fig_sector_metric = px.bar(sector_mean, x='Sector', y=selected_metric, color='Sector',
-                                   title=f"Average {selected_metric} by Sector",
-                                   text_auto='.2f')
-        st.plotly_chart(fig_sector_metric, use_container_width=True)
+        fig_sector_metric = make_sector_metric_chart(sector_key, tuple(risk_metrics), selected_metric)
+        st.plotly_chart(fig_sector_metric, use_container_width=True, config=STATIC_CHART_CONFIG)
 
     # --- Section 4: Company Explorer ---
     st.header("4. Top Companies Explorer")
@@ -123,25 +253,32 @@ if df_raw is not None:
         sort_by = st.selectbox("Sort Companies By", risk_metrics, index=0)
     
     with col_explore2:
-        top_n = st.slider("Number of Companies to Show", 5, 50, 15)
+        top_n = st.slider("Number of Companies to Show", 5, TOP_N_MAX, 15)
         
     ascending = st.checkbox("Show Lowest Scores (Best Performers)", value=False)
     
-    sorted_df = df.sort_values(by=sort_by, ascending=ascending).head(top_n)
+    highest, lowest = top_indices(sector_key, tuple(risk_metrics))[sort_by]
+    sorted_df = df_raw.loc[(lowest if ascending else highest)[:top_n]]
     
     # Display table
     st.subheader(f"Top {top_n} Companies based on {sort_by}")
-    st.dataframe(sorted_df, use_container_width=True)
+    display_cols = [col for col in DISPLAY_COLS if col in sorted_df.columns]
+    if sort_by not in display_cols:
+        display_cols.append(sort_by)
+    st.dataframe(sorted_df[display_cols], use_container_width=True)
     
     # Visualize top companies
-    fig_top = px.bar(sorted_df, x=sort_by, y='Symbol', orientation='h',
-                     title=f"Top {top_n} Companies by {sort_by}",
-                     color=sort_by, color_continuous_scale='Viridis')
+    # Plain NumPy arrays straight into go.Bar, skipping px's DataFrame handling
+    scores = sorted_df[sort_by].to_numpy()
+    fig_top = go.Figure(go.Bar(x=scores, y=sorted_df['Symbol'].to_numpy(), orientation='h',
+                               marker=dict(color=scores, colorscale='Viridis', showscale=True,
+                                           colorbar=dict(title=sort_by))))
                      
     # Invert y-axis to show top company at top
-    fig_top.update_layout(yaxis=dict(autorange="reversed"))
+    fig_top.update_layout(title=f"Top {top_n} Companies by {sort_by}",
+                          xaxis_title=sort_by, yaxis=dict(title='Symbol', autorange="reversed"))
     
-    st.plotly_chart(fig_top, use_container_width=True)
+    st.plotly_chart(fig_top, use_container_width=True, config=STATIC_CHART_CONFIG)
     
     # --- Scatter Plot for granular exploration ---
     st.header("5. Scatter Plot Explorer")
@@ -156,8 +293,7 @@ if df_raw is not None:
     with col_scatter3:
         color_by = st.selectbox("Color By", ['Sector'] + risk_metrics, index=0)
 
-    fig_scatter = px.scatter(df, x=x_axis, y=y_axis, color=color_by, hover_name='Symbol',
-                             title=f"{x_axis} vs {y_axis}", template="plotly_white")
+    fig_scatter = make_scatter(sector_key, x_axis, y_axis, color_by)
     st.plotly_chart(fig_scatter, use_container_width=True)
 
 else:
@@ -0,0 +1,21 @@
+# One-shot conversion of the dataset from CSV to Parquet.
+# app.py loads sp500esg.parquet in preference to sp500esg.csv unless the CSV is
+# newer, so rerun this after editing the CSV.
+import sys
+
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+def convert(csv_path, parquet_path=None):
+    parquet_path = parquet_path or csv_path.replace(".csv", ".parquet")
+    # Address and Description values contain embedded newlines; empty fields
+    # stay null, as with pd.read_csv
+    table = pacsv.read_csv(csv_path, parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                           convert_options=pacsv.ConvertOptions(strings_can_be_null=True))
+    pq.write_table(table, parquet_path, compression="zstd")
+    print(f"Wrote {table.num_rows} rows to {parquet_path}")
+
+
+if __name__ == "__main__":
+    convert(sys.argv[1] if len(sys.argv) > 1 else "sp500esg.csv")